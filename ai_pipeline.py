@@ -16,8 +16,8 @@ import numpy as np
 import pandas as pd
 import pickle
 
-from prophet import Prophet
-from db_models import init_db, SessionLocal, Visit, Forecast
+from forecast_intervals import INTERVAL_MODES, DEFAULT_INTERVAL_MODE, make_prophet, predict_with_intervals
+from db_models import init_db, SessionLocal, Visit, bulk_insert_forecasts, load_daily_history
 
 MODEL_DIR = "models"
 
@@ -58,16 +58,14 @@ def save_visits_to_db(df):
         session.close()
 
 
-def train_and_forecast(nama_faskes, forecast_days=14, holdout_days=14):
+def train_and_forecast(nama_faskes, forecast_days=14, holdout_days=14, interval_mode=DEFAULT_INTERVAL_MODE):
     session = SessionLocal()
     try:
         # load history from DB
-        rows = session.query(Visit).filter(Visit.nama_faskes == nama_faskes).order_by(Visit.ds).all()
-        if not rows:
+        df = load_daily_history(session, nama_faskes)[['ds', 'y']]
+        if df.empty:
             print(f"No history for {nama_faskes}")
             return None
-        df = pd.DataFrame([{'ds': r.ds, 'y': r.y} for r in rows])
-        df['ds'] = pd.to_datetime(df['ds'])
 
         # define train/holdout
         if len(df) <= holdout_days:
@@ -78,13 +76,13 @@ def train_and_forecast(nama_faskes, forecast_days=14, holdout_days=14):
             holdout_df = df.iloc[-holdout_days:]
 
         # train Prophet
-        model = Prophet(daily_seasonality=True, yearly_seasonality=False)
+        model = make_prophet(interval_mode)
         model.fit(train_df[['ds','y']])
 
         # forecast for the combined horizon (holdout + future)
         periods = holdout_days + forecast_days
         future = model.make_future_dataframe(periods=periods)
-        forecast = model.predict(future)
+        forecast = predict_with_intervals(model, future, interval_mode)
 
         # evaluate on holdout (if available)
         metrics = {}
@@ -104,9 +102,9 @@ def train_and_forecast(nama_faskes, forecast_days=14, holdout_days=14):
         # Save forecast rows for next forecast_days (we take the tail)
         forecast_tail = forecast[['ds','yhat','yhat_lower','yhat_upper']].iloc[-forecast_days:]
         now = datetime.utcnow()
-        for _, row in forecast_tail.iterrows():
-            rec = Forecast(nama_faskes=nama_faskes, ds=row['ds'].date(), yhat=float(row['yhat']), yhat_lower=float(row['yhat_lower']), yhat_upper=float(row['yhat_upper']), generated_at=now)
-            session.add(rec)
+        rows = [{'nama_faskes': nama_faskes, 'ds': ds.date(), 'yhat': float(yhat), 'yhat_lower': float(lower), 'yhat_upper': float(upper), 'interval_method': interval_mode, 'generated_at': now}
+                for ds, yhat, lower, upper in forecast_tail.itertuples(index=False)]
+        bulk_insert_forecasts(session, rows)
         session.commit()
 
         # persist model to disk
@@ -135,7 +133,7 @@ def main(args):
     results = []
     for f in faskes:
         print(f"Training + forecasting for {f['nama']}...")
-        res = train_and_forecast(f['nama'], forecast_days=args.forecast_days, holdout_days=args.holdout_days)
+        res = train_and_forecast(f['nama'], forecast_days=args.forecast_days, holdout_days=args.holdout_days, interval_mode=args.interval_mode)
         if res:
             results.append(res)
             print('Result:', res)
@@ -150,5 +148,6 @@ if __name__ == '__main__':
     parser.add_argument('--days-back', type=int, default=365)
     parser.add_argument('--forecast-days', type=int, default=14)
     parser.add_argument('--holdout-days', type=int, default=14)
+    parser.add_argument('--interval-mode', choices=list(INTERVAL_MODES), default=DEFAULT_INTERVAL_MODE)
     args = parser.parse_args()
     main(args)
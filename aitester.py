@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-from prophet import Prophet
+from forecast_intervals import INTERVAL_MODES, DEFAULT_INTERVAL_MODE, make_prophet, predict_with_intervals
 import numpy as np
 from datetime import timedelta, datetime
 import requests
+from faskes_index import FaskesIndex, load_faskes, score_candidates, top_k, status_kepadatan
 
 # ==========================================
 # 1. FASE DATA ENGINEERING (Simulasi Data)
@@ -51,15 +52,16 @@ def generate_dummy_data():
 # ==========================================
 # 2. FASE MACHINE LEARNING (Forecasting)
 # ==========================================
-def get_prediction(df_history, days_ahead=7):
+def get_prediction(df_history, days_ahead=7, interval_mode=DEFAULT_INTERVAL_MODE):
     """
     Melatih model Prophet untuk satu Faskes dan memprediksi masa depan.
+    `interval_mode` menentukan cara hitung yhat_lower/yhat_upper (lihat forecast_intervals.py).
     """
-    model = Prophet(daily_seasonality=True, yearly_seasonality=False)
+    model = make_prophet(interval_mode)
     model.fit(df_history[['ds', 'y']])
     
     future = model.make_future_dataframe(periods=days_ahead)
-    forecast = model.predict(future)
+    forecast = predict_with_intervals(model, future, interval_mode)
     
     return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
 
@@ -106,12 +108,34 @@ else:
 # --- Sidebar (Input User) ---
 st.sidebar.header("Menu Peserta")
 selected_date = st.sidebar.date_input("Rencana Tanggal Kunjungan", datetime.today() + timedelta(days=1))
-user_lat_long = "Monas, Jakarta" # Simulasi lokasi user
+# Lokasi user (default: Monas, Jakarta)
+user_lat = st.sidebar.number_input("Latitude lokasi Anda", value=-6.1754, format="%.4f")
+user_lon = st.sidebar.number_input("Longitude lokasi Anda", value=106.8272, format="%.4f")
+radius_km = st.sidebar.slider("Radius pencarian (km)", 1.0, 50.0, 10.0)
+top_n = st.sidebar.number_input("Jumlah rekomendasi", min_value=1, value=5)
+interval_mode = st.sidebar.selectbox("Mode interval prediksi", list(INTERVAL_MODES),
+                                     index=list(INTERVAL_MODES).index(DEFAULT_INTERVAL_MODE))
+
+@st.cache_resource
+def get_faskes_index():
+    return FaskesIndex(load_faskes())
 
 if st.sidebar.button("Cari Faskes Cerdas"):
     st.subheader(f"🔍 Hasil Analisis untuk Tanggal: {selected_date}")
     
-    results = []
+    # Kandidat: faskes dengan koordinat dalam radius (KD-tree); faskes tanpa
+    # koordinat (mis. dari Realtime API) tetap memakai nilai `jarak` bawaannya.
+    faskes_index = get_faskes_index()
+    idx_radius, jarak_radius = faskes_index.query_radius(user_lat, user_lon, radius_km)
+    jarak_by_nama = dict(zip(faskes_index.nama[idx_radius], jarak_radius))
+    kandidat = []
+    for faskes in list_faskes:
+        if faskes['nama'] in jarak_by_nama:
+            kandidat.append({**faskes, 'jarak': float(jarak_by_nama[faskes['nama']])})
+        elif faskes['nama'] not in faskes_index.position:
+            kandidat.append(faskes)
+
+    prediksi = []
     
     # Kolom untuk menampilkan grafik
     col1, col2 = st.columns([2, 1])
@@ -122,53 +146,44 @@ if st.sidebar.button("Cari Faskes Cerdas"):
     # --- PROSES UTAMA: Looping setiap Faskes untuk Prediksi ---
     progress_bar = st.progress(0)
     
-    for i, faskes in enumerate(list_faskes):
+    for i, faskes in enumerate(kandidat):
         # 1. Ambil data historis khusus faskes ini
         history_faskes = df_total[df_total['nama_faskes'] == faskes['nama']]
         
         # 2. Lakukan Prediksi (AI Running...)
-        forecast = get_prediction(history_faskes, days_ahead=14)
+        forecast = get_prediction(history_faskes, days_ahead=14, interval_mode=interval_mode)
         
         # 3. Ambil nilai prediksi pada tanggal yang dipilih user
         target_date = pd.to_datetime(selected_date)
         prediksi_hari_ini = forecast[forecast['ds'] == target_date]['yhat'].values[0]
-        prediksi_hari_ini = int(prediksi_hari_ini)
-        
-        # 4. Hitung Status Kepadatan
-        persen_isi = (prediksi_hari_ini / faskes['kapasitas']) * 100
-        
-        if persen_isi > 100:
-            status = "OVERLOAD 🔴"
-            skor_kepadatan = 10 # Hukuman besar untuk skor
-        elif persen_isi > 80:
-            status = "Padat 🟠"
-            skor_kepadatan = 5
-        else:
-            status = "Longgar 🟢"
-            skor_kepadatan = 1
-            
-        # 5. Hitung SKOR REKOMENDASI (Smart Finder Logic)
-        # Rumus: (Bobot Jarak * Jarak) + (Bobot Kepadatan * Skor Kepadatan)
-        skor_akhir = (1.5 * faskes['jarak']) + (3.0 * skor_kepadatan)
-        
-        results.append({
-            "nama_faskes": faskes['nama'],
-            "prediksi": int(prediksi_hari_ini),
-            "persen_isi": round(persen_isi, 1),
-            "status": status,
-            "skor_kepadatan": skor_kepadatan,
-            "skor_akhir": round(skor_akhir, 2),
-            "kapasitas": faskes['kapasitas'],
-            "jarak": faskes['jarak']
-        })
+        prediksi.append(int(prediksi_hari_ini))
 
         # Update progress
-        progress = int(((i + 1) / len(list_faskes)) * 100)
+        progress = int(((i + 1) / len(kandidat)) * 100)
         progress_bar.progress(progress)
 
+    # 4-5. Status kepadatan + SKOR REKOMENDASI (Smart Finder Logic), sekaligus untuk semua kandidat
+    # Rumus: (Bobot Jarak * Jarak) + (Bobot Kepadatan * Skor Kepadatan)
+    results = []
+    if kandidat:
+        kapasitas = np.array([f['kapasitas'] for f in kandidat], dtype=float)
+        jarak = np.array([f['jarak'] for f in kandidat], dtype=float)
+        persen_isi, skor_kepadatan, skor_akhir = score_candidates(prediksi, kapasitas, jarak)
+        for j in top_k(skor_akhir, int(top_n)):
+            results.append({
+                "nama_faskes": kandidat[j]['nama'],
+                "prediksi": prediksi[j],
+                "persen_isi": round(float(persen_isi[j]), 1),
+                "status": status_kepadatan(skor_kepadatan[j]),
+                "skor_kepadatan": int(skor_kepadatan[j]),
+                "skor_akhir": round(float(skor_akhir[j]), 2),
+                "kapasitas": kandidat[j]['kapasitas'],
+                "jarak": round(float(jarak[j]), 2)
+            })
+
     # Setelah loop: susun dan tampilkan hasil
     if results:
-        df_results = pd.DataFrame(results).sort_values("skor_akhir")
+        df_results = pd.DataFrame(results)
 
         with col2:
             st.write("### 🔎 Rekomendasi Faskes")
@@ -0,0 +1,266 @@
+"""
+Backtesting (rolling-origin cross-validation)
+- Load visit history per faskes from the DB (via db_models)
+- For every faskes, every cutoff and every forecaster backend: fit on history
+  up to the cutoff and forecast the next `horizon` days
+- (faskes, cutoff, backend) fits are spread across a process pool
+- MAE / MAPE / interval coverage are computed with NumPy over aligned arrays
+- Each fit is cached on disk, keyed by a hash of the data it saw and the
+  config (including the forecaster's own parameters), so re-runs only compute
+  cutoffs that are new
+- History is aggregated per day with db_models.load_daily_history, the same
+  target the worker and ai_pipeline fit on
+
+Usage:
+    python backtest.py --initial-days 180 --horizon 14 --step 7
+    python backtest.py --backends prophet seasonal_naive --workers 4
+    python backtest.py --backends prophet prophet_reduced prophet_residual
+
+"""
+import os
+import json
+import hashlib
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+from db_models import ReadSessionLocal, load_daily_history
+
+CACHE_DIR = os.path.join("backtests", "cache")
+SEASON_LENGTH = 7  # pola mingguan
+NAIVE_QUANTILES = (0.1, 0.9)  # interval 80% untuk seasonal_naive
+
+
+def load_history():
+    """Return {nama_faskes: DataFrame[ds, y]} sorted by ds, from the visits table."""
+    session = ReadSessionLocal()
+    try:
+        df = load_daily_history(session)
+    finally:
+        session.close()
+    return {name: g[['ds', 'y']].reset_index(drop=True) for name, g in df.groupby('nama_faskes')}
+
+
+# ------------------------------------------
+# Forecaster backends
+# Each takes (train_df, future_ds) and returns yhat, yhat_lower, yhat_upper as
+# arrays aligned with `future_ds`.
+# They live at module level so the process pool can pickle them.
+# ------------------------------------------
+def forecast_prophet(train_df, future_ds, interval_mode='full'):
+    from forecast_intervals import make_prophet, predict_with_intervals
+
+    model = make_prophet(interval_mode)
+    model.fit(train_df[['ds', 'y']])
+    forecast = predict_with_intervals(model, pd.DataFrame({'ds': future_ds}), interval_mode)
+    return (forecast['yhat'].to_numpy(),
+            forecast['yhat_lower'].to_numpy(),
+            forecast['yhat_upper'].to_numpy())
+
+
+def forecast_seasonal_naive(train_df, future_ds):
+    """Baseline: repeat the last week; interval from in-sample seasonal residuals (80%)."""
+    horizon = len(future_ds)
+    y = train_df['y'].to_numpy(dtype=float)
+    if len(y) < SEASON_LENGTH:
+        yhat = np.full(horizon, y[-1])
+        return yhat, yhat, yhat
+    last_season = y[-SEASON_LENGTH:]
+    yhat = np.resize(last_season, horizon)
+    resid = y[SEASON_LENGTH:] - y[:-SEASON_LENGTH]
+    if resid.size:
+        lo, hi = np.quantile(resid, NAIVE_QUANTILES)
+    else:
+        lo = hi = 0.0
+    return yhat, yhat + lo, yhat + hi
+
+
+FORECASTERS = {
+    'prophet': forecast_prophet,
+    'prophet_reduced': partial(forecast_prophet, interval_mode='reduced'),
+    'prophet_residual': partial(forecast_prophet, interval_mode='residual'),
+    'seasonal_naive': forecast_seasonal_naive,
+}
+DEFAULT_BACKENDS = ['prophet', 'seasonal_naive']
+
+
+def forecaster_config(backend):
+    """Parameters that change a backend's output; part of the cache key so that
+    editing them (e.g. REDUCED_UNCERTAINTY_SAMPLES) invalidates cached folds."""
+    fn = FORECASTERS[backend]
+    if getattr(fn, 'func', fn) is forecast_prophet:
+        from forecast_intervals import INTERVAL_MODES, PROPHET_PARAMS
+
+        interval_mode = getattr(fn, 'keywords', {}).get('interval_mode', 'full')
+        return {'interval_mode': interval_mode, 'uncertainty_samples': INTERVAL_MODES[interval_mode],
+                'prophet_params': PROPHET_PARAMS}
+    return {'season_length': SEASON_LENGTH, 'quantiles': list(NAIVE_QUANTILES)}
+
+
+# ------------------------------------------
+# Cutoffs, caching
+# ------------------------------------------
+def make_cutoffs(df, initial_days, horizon, step):
+    """Cutoff dates (last training day) from `initial_days` in, every `step` days,
+    keeping room for a full horizon of actuals after each cutoff."""
+    ds = df['ds']
+    first, last = ds.iloc[0], ds.iloc[-1]
+    start = first + pd.Timedelta(days=initial_days - 1)
+    end = last - pd.Timedelta(days=horizon)
+    if start > end:
+        return []
+    return list(pd.date_range(start=start, end=end, freq=f"{step}D"))
+
+
+def window_hash(df, cutoff, horizon):
+    """Hash of the data a (cutoff, horizon) fit sees: history up to cutoff + horizon.
+    Data appended later does not change it, so earlier cutoffs stay cached."""
+    end = cutoff + pd.Timedelta(days=horizon)
+    w = df[df['ds'] <= end]
+    h = hashlib.sha1()
+    h.update(w['ds'].to_numpy(dtype='datetime64[D]').tobytes())
+    h.update(w['y'].to_numpy(dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def cache_path(nama_faskes, backend, cutoff, horizon, data_hash, config):
+    key = json.dumps({'faskes': nama_faskes, 'backend': backend, 'config': config,
+                      'cutoff': cutoff.date().isoformat(), 'horizon': horizon, 'data': data_hash},
+                     sort_keys=True, default=str)
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode()).hexdigest() + ".npz")
+
+
+def run_fold(train_df, actual_df, backend, cutoff, horizon, path):
+    """Fit one (faskes, cutoff, backend) fold and write aligned arrays to `path`."""
+    future_ds = pd.date_range(start=cutoff + pd.Timedelta(days=1), periods=horizon, freq='D')
+    yhat, lower, upper = FORECASTERS[backend](train_df, future_ds)
+    # align actuals with forecast days; days without a visit record stay NaN
+    y = actual_df.set_index('ds')['y'].reindex(future_ds).to_numpy(dtype=float)
+    arrays = {
+        'y': y,
+        'yhat': np.asarray(yhat, dtype=float),
+        'yhat_lower': np.asarray(lower, dtype=float),
+        'yhat_upper': np.asarray(upper, dtype=float),
+    }
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return arrays
+
+
+def load_fold(path):
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+# ------------------------------------------
+# Metrics
+# ------------------------------------------
+def compute_metrics(y, yhat, lower, upper):
+    """MAE, MAPE and interval coverage over 2-D (fold, horizon-step) arrays.
+    Returns overall values plus per-horizon-step MAE."""
+    valid = ~np.isnan(y)
+    n = int(valid.sum())
+    if n == 0:
+        return {'n': 0, 'mae': None, 'mape': None, 'coverage': None, 'mae_by_step': []}
+    abs_err = np.where(valid, np.abs(yhat - y), 0.0)
+    nonzero = valid & (y != 0)
+    ape = np.where(nonzero, abs_err / np.where(nonzero, np.abs(y), 1.0), 0.0)
+    covered = valid & (y >= lower) & (y <= upper)
+    count_by_step = valid.sum(axis=0)
+    mae_by_step = np.divide(abs_err.sum(axis=0), count_by_step,
+                            out=np.full(y.shape[1], np.nan), where=count_by_step > 0)
+    return {
+        'n': n,
+        'mae': float(abs_err.sum() / n),
+        'mape': float(ape.sum() / nonzero.sum() * 100) if nonzero.any() else None,
+        'coverage': float(covered.sum() / n),
+        'mae_by_step': [None if np.isnan(v) else round(float(v), 3) for v in mae_by_step],
+    }
+
+
+def backtest(history, backends, initial_days=180, horizon=14, step=7, workers=None):
+    """Run rolling-origin backtests for every faskes x backend.
+
+    Returns a list of {nama_faskes, backend, folds, cached, metrics}.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    folds = {}    # (faskes, backend) -> list of fold arrays, in cutoff order
+    pending = []  # (faskes, backend, idx, cutoff, train_df, actual_df, path)
+    n_cached = {}
+    configs = {backend: forecaster_config(backend) for backend in backends}
+    for nama_faskes, df in history.items():
+        cutoffs = make_cutoffs(df, initial_days, horizon, step)
+        for backend in backends:
+            config = configs[backend]
+            slots = folds.setdefault((nama_faskes, backend), [None] * len(cutoffs))
+            n_cached[(nama_faskes, backend)] = 0
+            for i, cutoff in enumerate(cutoffs):
+                path = cache_path(nama_faskes, backend, cutoff, horizon, window_hash(df, cutoff, horizon), config)
+                if os.path.exists(path):
+                    slots[i] = load_fold(path)
+                    n_cached[(nama_faskes, backend)] += 1
+                    continue
+                end = cutoff + pd.Timedelta(days=horizon)
+                train_df = df[df['ds'] <= cutoff]
+                actual_df = df[(df['ds'] > cutoff) & (df['ds'] <= end)]
+                pending.append((nama_faskes, backend, i, cutoff, train_df, actual_df, path))
+
+    if pending:
+        print(f"Fitting {len(pending)} new folds ({sum(n_cached.values())} cached)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_fold, train_df, actual_df, backend, cutoff, horizon, path): (nama_faskes, backend, i)
+                       for nama_faskes, backend, i, cutoff, train_df, actual_df, path in pending}
+            for fut in as_completed(futures):
+                nama_faskes, backend, i = futures[fut]
+                try:
+                    folds[(nama_faskes, backend)][i] = fut.result()
+                except Exception as e:
+                    print(f"Fold failed for {nama_faskes} / {backend} (cutoff #{i}):", e)
+
+    results = []
+    for (nama_faskes, backend), slots in folds.items():
+        done = [f for f in slots if f is not None]
+        stacked = {k: np.vstack([f[k] for f in done]) if done else np.empty((0, horizon))
+                   for k in ('y', 'yhat', 'yhat_lower', 'yhat_upper')}
+        metrics = compute_metrics(stacked['y'], stacked['yhat'], stacked['yhat_lower'], stacked['yhat_upper'])
+        results.append({'nama_faskes': nama_faskes, 'backend': backend, 'folds': len(done),
+                        'cached': n_cached[(nama_faskes, backend)], 'metrics': metrics})
+    return results
+
+
+def main(args):
+    unknown = [b for b in args.backends if b not in FORECASTERS]
+    if unknown:
+        raise SystemExit(f"Unknown backend(s): {', '.join(unknown)}. Choose from {', '.join(FORECASTERS)}")
+    print('Loading history from DB...')
+    history = load_history()
+    if not history:
+        print('No history in DB. Run ai_pipeline.py or the worker first.')
+        return
+    results = backtest(history, args.backends, initial_days=args.initial_days,
+                       horizon=args.horizon, step=args.step, workers=args.workers)
+
+    print('\nSummary:')
+    for r in sorted(results, key=lambda r: (r['nama_faskes'], r['backend'])):
+        m = r['metrics']
+        print(r['nama_faskes'], r['backend'], f"folds={r['folds']} (cached {r['cached']})",
+              {k: m[k] for k in ('mae', 'mape', 'coverage')})
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+        print('Results written to', args.output)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--initial-days', type=int, default=180, help='minimum training days before the first cutoff')
+    parser.add_argument('--horizon', type=int, default=14)
+    parser.add_argument('--step', type=int, default=7, help='days between cutoffs')
+    parser.add_argument('--backends', nargs='+', default=DEFAULT_BACKENDS, help=f"choose from: {', '.join(FORECASTERS)}")
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (default: CPU count)')
+    parser.add_argument('--output', default=None, help='optional JSON file for the results')
+    args = parser.parse_args()
+    main(args)
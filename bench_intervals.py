@@ -0,0 +1,78 @@
+"""
+Benchmark mode interval predict (lihat forecast_intervals.py)
+- Data dummy per faskes dari ai_pipeline.generate_dummy_data
+- Fit Prophet sekali per (faskes, mode) pada history minus `holdout_days`,
+  lalu ukur latency predict (history + holdout + forecast, seperti
+  worker_redis) dan peak memory tracemalloc selama predict
+- Coverage = porsi nilai aktual holdout di dalam [yhat_lower, yhat_upper]
+  (target: interval_width model, default 0.8)
+
+Usage:
+    python bench_intervals.py --days-back 365 --holdout-days 28 --repeats 3
+"""
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from ai_pipeline import generate_dummy_data
+from forecast_intervals import INTERVAL_MODES, make_prophet, predict_with_intervals
+
+
+def bench_mode(train_df, holdout_df, interval_mode, forecast_days, repeats):
+    model = make_prophet(interval_mode)
+    model.fit(train_df[['ds', 'y']])
+    future = model.make_future_dataframe(periods=len(holdout_df) + forecast_days)
+
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        forecast = predict_with_intervals(model, future, interval_mode)
+        timings.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    predict_with_intervals(model, future, interval_mode)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pred = forecast.set_index('ds').reindex(holdout_df['ds'])
+    y = holdout_df['y'].to_numpy(dtype=float)
+    covered = (y >= pred['yhat_lower'].to_numpy()) & (y <= pred['yhat_upper'].to_numpy())
+    return {
+        'predict_ms': float(np.median(timings) * 1000),
+        'peak_mb': peak / 2**20,
+        'coverage': float(covered.mean()),
+        'width': float((pred['yhat_upper'] - pred['yhat_lower']).mean()),
+        'mae': float(np.abs(pred['yhat'].to_numpy() - y).mean()),
+    }
+
+
+def main(args):
+    df, faskes = generate_dummy_data(days_back=args.days_back)
+    rows = []
+    for f in faskes:
+        hist = df[df['nama_faskes'] == f['nama']][['ds', 'y']].reset_index(drop=True)
+        train_df, holdout_df = hist.iloc[:-args.holdout_days], hist.iloc[-args.holdout_days:]
+        # dummy data memakai datetime.today() (ada komponen jam); samakan ke tanggal
+        train_df = train_df.assign(ds=train_df['ds'].dt.normalize())
+        holdout_df = holdout_df.assign(ds=holdout_df['ds'].dt.normalize())
+        for mode in args.modes:
+            res = bench_mode(train_df, holdout_df, mode, args.forecast_days, args.repeats)
+            rows.append({'nama_faskes': f['nama'], 'mode': mode, **res})
+
+    out = pd.DataFrame(rows)
+    pd.set_option('display.width', 200)
+    print(out.round(3).to_string(index=False))
+    print('\nRata-rata per mode:')
+    print(out.groupby('mode', sort=False)[['predict_ms', 'peak_mb', 'coverage', 'width', 'mae']].mean().round(3))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days-back', type=int, default=365)
+    parser.add_argument('--holdout-days', type=int, default=28)
+    parser.add_argument('--forecast-days', type=int, default=14)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--modes', nargs='+', default=list(INTERVAL_MODES), choices=list(INTERVAL_MODES))
+    args = parser.parse_args()
+    main(args)
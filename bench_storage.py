@@ -0,0 +1,159 @@
+"""
+Benchmark konkurensi storage: worker menulis sementara API membaca
+- Writer thread meniru worker_redis: insert Visit satu per satu (commit per
+  event) dan setiap BATCH_SIZE event menulis FORECAST_ROWS baris forecast
+- N reader thread meniru snapshot_api `/forecasts/{nama_faskes}`
+- Dibandingkan dua mode:
+    shared : satu engine tanpa WAL untuk writer dan reader (perilaku lama, SQLite saja)
+    split  : writer_engine + reader_engine dari db_models.make_engines (WAL di SQLite)
+- Default: file SQLite sementara per mode. Untuk Postgres isi
+  `BENCH_DATABASE_URL` dengan DB scratch; `DATABASE_URL` tidak pernah dipakai.
+  Semua baris benchmark memakai nama faskes berawalan BENCH_TAG dan dihapus
+  lagi setelah tiap mode, jadi tidak pernah terbaca sebagai prediksi asli.
+
+Usage:
+    python bench_storage.py --seconds 10 --readers 8
+    BENCH_DATABASE_URL=postgresql+psycopg2://.../bench python bench_storage.py --modes split
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import threading
+from datetime import datetime, date, timedelta
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db_models import Base, Visit, Forecast, make_engines, bulk_insert_forecasts, DATABASE_URL
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL")
+BENCH_TAG = "__bench__ "
+FASKES = [BENCH_TAG + n for n in ("Faskes A (Puskesmas Kota)", "Faskes B (Klinik Sehat)", "Faskes C (RSUD Tipe D)")]
+BATCH_SIZE = 20
+FORECAST_ROWS = 379  # ~365 hari history + 14 hari forecast, seperti worker_redis
+
+
+def make_shared_engine(url):
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    return engine, engine
+
+
+def writer_loop(Session, stop, stats):
+    session = Session()
+    n = 0
+    try:
+        while not stop.is_set():
+            name = random.choice(FASKES)
+            t0 = time.perf_counter()
+            session.add(Visit(ds=date.today(), y=random.randint(20, 150), nama_faskes=name, kapasitas=100, jarak=1.0))
+            session.commit()
+            n += 1
+            if n % BATCH_SIZE == 0:
+                now = datetime.utcnow()
+                start = date.today() - timedelta(days=FORECAST_ROWS - 15)
+                rows = [{'nama_faskes': name, 'ds': start + timedelta(days=i), 'yhat': 100.0,
+                         'yhat_lower': 80.0, 'yhat_upper': 120.0, 'generated_at': now}
+                        for i in range(FORECAST_ROWS)]
+                bulk_insert_forecasts(session, rows)
+                session.commit()
+            stats['write_latency'].append(time.perf_counter() - t0)
+    finally:
+        session.close()
+
+
+def reader_loop(Session, stop, stats):
+    latencies = []
+    errors = 0
+    while not stop.is_set():
+        name = random.choice(FASKES)
+        t0 = time.perf_counter()
+        session = Session()
+        try:
+            today = date.today()
+            session.query(Forecast).filter(Forecast.nama_faskes == name, Forecast.ds >= today,
+                                           Forecast.ds <= today + timedelta(days=14)).order_by(Forecast.ds).all()
+            latencies.append(time.perf_counter() - t0)
+        except Exception:
+            errors += 1
+        finally:
+            session.close()
+    with stats['lock']:
+        stats['read_latency'].extend(latencies)
+        stats['read_errors'] += errors
+
+
+def run(mode, url, seconds, readers):
+    if mode == 'shared':
+        writer, reader = make_shared_engine(url)
+    else:
+        writer, reader = make_engines(url, read_pool_size=readers)
+    Base.metadata.create_all(bind=writer)
+    cleanup(writer)
+    stats = {'lock': threading.Lock(), 'read_latency': [], 'read_errors': 0, 'write_latency': []}
+    stop = threading.Event()
+    threads = [threading.Thread(target=writer_loop, args=(sessionmaker(bind=writer), stop, stats))]
+    threads += [threading.Thread(target=reader_loop, args=(sessionmaker(bind=reader), stop, stats))
+                for _ in range(readers)]
+    for t in threads:
+        t.start()
+    try:
+        time.sleep(seconds)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        cleanup(writer)
+        writer.dispose()
+        reader.dispose()
+
+    reads = np.array(stats['read_latency']) * 1000
+    writes = np.array(stats['write_latency']) * 1000
+    p = lambda a, q: float(np.percentile(a, q)) if a.size else float('nan')
+    print(f"[{mode}] reads: {reads.size / seconds:.0f}/s  p50={p(reads, 50):.2f}ms  p99={p(reads, 99):.2f}ms  "
+          f"errors={stats['read_errors']}  |  writes: {writes.size / seconds:.0f}/s  p99={p(writes, 99):.2f}ms")
+
+
+def cleanup(engine):
+    """Hapus semua baris benchmark (nama_faskes berawalan BENCH_TAG)."""
+    session = sessionmaker(bind=engine)()
+    try:
+        for model in (Visit, Forecast):
+            session.query(model).filter(model.nama_faskes.like(BENCH_TAG + '%')).delete(synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+
+
+def main(args):
+    if BENCH_DATABASE_URL and BENCH_DATABASE_URL == DATABASE_URL:
+        raise SystemExit("BENCH_DATABASE_URL must not point at DATABASE_URL; use a scratch database")
+    for mode in args.modes:
+        if not BENCH_DATABASE_URL:
+            # file DB baru per mode agar hasil tidak saling mempengaruhi
+            fd, path = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            url = f"sqlite:///{path}"
+        elif mode == 'shared' and not BENCH_DATABASE_URL.startswith("sqlite"):
+            print("[shared] skipped: the legacy shared engine only existed for SQLite")
+            continue
+        else:
+            url = BENCH_DATABASE_URL
+        try:
+            run(mode, url, args.seconds, args.readers)
+        finally:
+            if not BENCH_DATABASE_URL:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--modes', nargs='+', default=['shared', 'split'], choices=['shared', 'split'])
+    args = parser.parse_args()
+    main(args)
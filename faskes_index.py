@@ -0,0 +1,141 @@
+"""
+Spatial index + vectorized scoring untuk rekomendasi faskes
+- Faskes membawa koordinat (lat/lon); indeks KD-tree dibangun di atas vektor
+  satuan 3D sehingga query radius (km) di permukaan bumi tetap sublinear
+- Skor rekomendasi (`skor_akhir`, sama dengan aitester.py) dihitung dalam
+  bentuk array untuk semua kandidat sekaligus, lalu top-k via argpartition
+
+Dipakai oleh aitester.py (UI) dan endpoint `/recommend` di snapshot_api.py.
+Index bersifat read-only setelah dibangun, jadi aman dipakai bersama oleh
+banyak request/thread.
+
+Usage:
+    idx = FaskesIndex(load_faskes())
+    kandidat, jarak_km = idx.query_radius(-6.1754, 106.8272, radius_km=10)
+"""
+import os
+import json
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+FASKES_FILE = os.environ.get("FASKES_FILE", "faskes.json")
+
+# Bobot rumus Smart Finder (lihat aitester.py)
+BOBOT_JARAK = 1.5
+BOBOT_KEPADATAN = 3.0
+
+# Faskes demo (sekitar Monas, Jakarta). Ganti lewat file JSON `FASKES_FILE`
+# berisi list {nama, kapasitas, lat, lon} untuk data faskes sebenarnya.
+DEFAULT_FASKES = [
+    {"nama": "Faskes A (Puskesmas Kota)", "kapasitas": 150, "lat": -6.1862, "lon": 106.8272},
+    {"nama": "Faskes B (Klinik Sehat)", "kapasitas": 80, "lat": -6.1754, "lon": 106.8588},
+    {"nama": "Faskes C (RSUD Tipe D)", "kapasitas": 200, "lat": -6.1304, "lon": 106.8272},
+]
+
+
+def load_faskes(path=FASKES_FILE):
+    """Baca daftar faskes dari file JSON jika ada, selain itu pakai DEFAULT_FASKES."""
+    if path and os.path.exists(path):
+        with open(path) as fh:
+            return json.load(fh)
+    return DEFAULT_FASKES
+
+
+def _to_unit_xyz(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _km_to_chord(km):
+    # jarak great-circle (km) -> panjang chord pada bola satuan; di-clamp ke setengah
+    # keliling bumi (chord 2) agar radius lebih besar tidak "memutar" jadi lebih kecil
+    km = np.minimum(np.asarray(km, dtype=float), np.pi * EARTH_RADIUS_KM)
+    return 2.0 * np.sin(km / (2.0 * EARTH_RADIUS_KM))
+
+
+def _chord_to_km(chord):
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord, dtype=float) / 2.0, 0.0, 1.0))
+
+
+def score_candidates(prediksi, kapasitas, jarak):
+    """Versi vektor dari rumus skor di aitester.py.
+
+    Semua argumen adalah array sejajar (satu elemen per kandidat).
+    Return (persen_isi, skor_kepadatan, skor_akhir); skor lebih kecil = lebih baik.
+    """
+    prediksi = np.asarray(prediksi, dtype=float)
+    kapasitas = np.asarray(kapasitas, dtype=float)
+    persen_isi = prediksi / kapasitas * 100
+    skor_kepadatan = np.select([persen_isi > 100, persen_isi > 80], [10, 5], default=1)
+    skor_akhir = BOBOT_JARAK * np.asarray(jarak, dtype=float) + BOBOT_KEPADATAN * skor_kepadatan
+    return persen_isi, skor_kepadatan, skor_akhir
+
+
+def top_k(skor, k):
+    """Indeks k skor terkecil, terurut naik. O(n) argpartition + sort kecil atas k."""
+    skor = np.asarray(skor)
+    if k <= 0 or skor.size == 0:
+        return np.empty(0, dtype=int)
+    if k < skor.size:
+        idx = np.argpartition(skor, k - 1)[:k]
+    else:
+        idx = np.arange(skor.size)
+    return idx[np.argsort(skor[idx], kind='stable')]
+
+
+def status_kepadatan(skor_kepadatan):
+    return {10: "OVERLOAD 🔴", 5: "Padat 🟠"}.get(int(skor_kepadatan), "Longgar 🟢")
+
+
+class FaskesIndex:
+    """KD-tree atas koordinat faskes, plus array sejajar nama/kapasitas."""
+
+    def __init__(self, faskes):
+        self.nama = np.array([f['nama'] for f in faskes], dtype=object)
+        self.kapasitas = np.array([f['kapasitas'] for f in faskes], dtype=float)
+        self.lat = np.array([f['lat'] for f in faskes], dtype=float)
+        self.lon = np.array([f['lon'] for f in faskes], dtype=float)
+        self.position = {n: i for i, n in enumerate(self.nama)}
+        self.tree = cKDTree(_to_unit_xyz(self.lat, self.lon))
+
+    def __len__(self):
+        return len(self.nama)
+
+    def distances_km(self, lat, lon, idx=None):
+        """Jarak great-circle (km) dari (lat, lon) ke faskes `idx` (default: semua)."""
+        idx = slice(None) if idx is None else idx
+        chord = np.linalg.norm(self.tree.data[idx] - _to_unit_xyz(lat, lon), axis=-1)
+        return _chord_to_km(chord)
+
+    def query_radius(self, lat, lon, radius_km):
+        """Indeks faskes dalam `radius_km` dari (lat, lon), beserta jaraknya (km)."""
+        idx = np.asarray(self.tree.query_ball_point(_to_unit_xyz(lat, lon), _km_to_chord(radius_km)), dtype=int)
+        return idx, self.distances_km(lat, lon, idx)
+
+    def recommend(self, lat, lon, prediksi, radius_km=10.0, k=5):
+        """Top-k faskes dalam radius, diurutkan menurut `skor_akhir`.
+
+        `prediksi` adalah array prediksi jumlah pasien sejajar dengan index
+        (NaN = belum ada forecast; faskes tersebut dilewati).
+        """
+        idx, jarak = self.query_radius(lat, lon, radius_km)
+        pred = np.asarray(prediksi, dtype=float)[idx]
+        known = ~np.isnan(pred)
+        idx, jarak, pred = idx[known], jarak[known], pred[known]
+        persen_isi, skor_kepadatan, skor_akhir = score_candidates(pred, self.kapasitas[idx], jarak)
+        order = top_k(skor_akhir, k)
+        return [{
+            "nama_faskes": self.nama[idx[j]],
+            "prediksi": int(pred[j]),
+            "persen_isi": round(float(persen_isi[j]), 1),
+            "status": status_kepadatan(skor_kepadatan[j]),
+            "skor_kepadatan": int(skor_kepadatan[j]),
+            "skor_akhir": round(float(skor_akhir[j]), 2),
+            "kapasitas": int(self.kapasitas[idx[j]]),
+            "jarak": round(float(jarak[j]), 2),
+            "lat": float(self.lat[idx[j]]),
+            "lon": float(self.lon[idx[j]]),
+        } for j in order]
@@ -0,0 +1,65 @@
+"""
+Mode interval ketidakpastian untuk Prophet (yhat_lower / yhat_upper)
+- full     : simulasi bawaan Prophet, `uncertainty_samples` = 1000
+- reduced  : simulasi dengan sampel lebih sedikit (REDUCED_UNCERTAINTY_SAMPLES)
+- residual : tanpa simulasi (`uncertainty_samples=0`); interval = yhat + kuantil
+             residual in-sample (y - yhat) pada `interval_width` model
+
+Mode yang dipakai disimpan di kolom `Forecast.interval_method`.
+Pilih default lewat env `INTERVAL_MODE`; lihat bench_intervals.py untuk
+perbandingan latency predict dan coverage tiap mode.
+"""
+import os
+import numpy as np
+from prophet import Prophet
+
+REDUCED_UNCERTAINTY_SAMPLES = 100
+INTERVAL_MODES = {
+    'full': 1000,
+    'reduced': REDUCED_UNCERTAINTY_SAMPLES,
+    'residual': 0,
+}
+DEFAULT_INTERVAL_MODE = os.environ.get("INTERVAL_MODE", "full")
+# Parameter Prophet standar repo ini (juga dipakai sebagai bagian cache key di backtest.py)
+PROPHET_PARAMS = {'daily_seasonality': True, 'yearly_seasonality': False}
+
+
+def _check_mode(interval_mode):
+    if interval_mode not in INTERVAL_MODES:
+        raise ValueError(f"Unknown interval mode {interval_mode!r}; choose from {', '.join(INTERVAL_MODES)}")
+
+
+# Gagal saat import (worker, ai_pipeline, ...) bila env INTERVAL_MODE salah ketik,
+# bukan diam-diam melewati setiap forecast.
+_check_mode(DEFAULT_INTERVAL_MODE)
+
+
+def make_prophet(interval_mode=DEFAULT_INTERVAL_MODE, **kwargs):
+    """Prophet dengan konfigurasi standar repo ini dan `uncertainty_samples` sesuai mode."""
+    _check_mode(interval_mode)
+    params = dict(PROPHET_PARAMS, **kwargs)
+    return Prophet(uncertainty_samples=INTERVAL_MODES[interval_mode], **params)
+
+
+def predict_with_intervals(model, future, interval_mode=DEFAULT_INTERVAL_MODE):
+    """`model.predict(future)` yang selalu mengisi yhat_lower/yhat_upper.
+
+    Untuk mode 'residual' interval dihitung dari residual in-sample pada
+    `model.history`; baris history yang sudah ada di `future` dipakai ulang
+    sehingga tidak perlu predict kedua kalinya.
+    """
+    _check_mode(interval_mode)
+    forecast = model.predict(future)
+    if interval_mode != 'residual':
+        return forecast
+
+    history = model.history
+    fitted = forecast.set_index('ds')['yhat'].reindex(history['ds'])
+    if fitted.isna().any():
+        fitted = model.predict(history[['ds']]).set_index('ds')['yhat']
+    resid = history['y'].to_numpy(dtype=float) - fitted.to_numpy(dtype=float)
+    alpha = (1 - model.interval_width) / 2
+    lo, hi = np.quantile(resid, [alpha, 1 - alpha])
+    forecast['yhat_lower'] = forecast['yhat'] + lo
+    forecast['yhat_upper'] = forecast['yhat'] + hi
+    return forecast
@@ -2,8 +2,15 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 import redis
 import json
-from db_models import SessionLocal, Forecast
+import math
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy import func
+from db_models import ReadSessionLocal, Forecast, init_db
 from datetime import datetime, date, timedelta
+from faskes_index import FaskesIndex, load_faskes
 
 app = FastAPI(title="Forecast Snapshot API")
 
@@ -13,6 +20,80 @@ SNAPSHOT_KEY_PREFIX = "forecast_snapshot:"
 
 r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
 
+# Pastikan skema terbaru (mis. kolom forecasts.interval_method) sebelum melayani
+# request; API bisa start lebih dulu dari worker (run_all.bat menjalankan semuanya bersamaan).
+init_db()
+
+# Spatial index dibangun sekali saat startup; read-only sehingga aman dipakai
+# bersama oleh semua request (endpoint sync dijalankan di threadpool FastAPI).
+faskes_index = FaskesIndex(load_faskes())
+
+# Cache prediksi per tanggal: satu query DB melayani banyak request /recommend.
+# LRU terbatas (PREDIKSI_CACHE_MAX tanggal) dan entry kedaluwarsa dibuang saat
+# insert, jadi tanggal acak dari client tidak membuat memori tumbuh tanpa batas.
+# Refresh per tanggal di-serialize: saat entry kedaluwarsa hanya satu thread yang
+# query DB, request lain untuk tanggal itu menunggu lalu memakai hasilnya.
+PREDIKSI_TTL_SECONDS = 30
+PREDIKSI_CACHE_MAX = 64
+_prediksi_cache = OrderedDict()  # tanggal -> (waktu_load, array prediksi)
+_prediksi_inflight = {}          # tanggal -> Lock selama refresh berjalan
+_prediksi_lock = threading.Lock()
+
+
+def _cached_prediksi(tanggal: date):
+    # dipanggil dengan _prediksi_lock dipegang
+    hit = _prediksi_cache.get(tanggal)
+    if hit and time.monotonic() - hit[0] < PREDIKSI_TTL_SECONDS:
+        _prediksi_cache.move_to_end(tanggal)
+        return hit[1]
+    return None
+
+
+def _query_prediksi(tanggal: date):
+    session = ReadSessionLocal()
+    try:
+        latest = session.query(Forecast.nama_faskes, func.max(Forecast.generated_at).label('gen')) \
+            .filter(Forecast.ds == tanggal).group_by(Forecast.nama_faskes).subquery()
+        rows = session.query(Forecast.nama_faskes, Forecast.yhat) \
+            .join(latest, (Forecast.nama_faskes == latest.c.nama_faskes) & (Forecast.generated_at == latest.c.gen)) \
+            .filter(Forecast.ds == tanggal).all()
+    finally:
+        session.close()
+    prediksi = np.full(len(faskes_index), np.nan)
+    for nama, yhat in rows:
+        pos = faskes_index.position.get(nama)
+        if pos is not None:
+            prediksi[pos] = yhat
+    return prediksi
+
+
+def load_prediksi(tanggal: date):
+    """Array yhat terbaru per faskes untuk `tanggal`, sejajar dengan faskes_index (NaN jika tidak ada)."""
+    with _prediksi_lock:
+        prediksi = _cached_prediksi(tanggal)
+        if prediksi is not None:
+            return prediksi
+        date_lock = _prediksi_inflight.setdefault(tanggal, threading.Lock())
+    with date_lock:
+        with _prediksi_lock:
+            prediksi = _cached_prediksi(tanggal)
+            if prediksi is not None:
+                return prediksi
+        try:
+            prediksi = _query_prediksi(tanggal)
+            with _prediksi_lock:
+                now = time.monotonic()
+                for k in [k for k, (t, _) in _prediksi_cache.items() if now - t >= PREDIKSI_TTL_SECONDS]:
+                    del _prediksi_cache[k]
+                _prediksi_cache[tanggal] = (now, prediksi)
+                _prediksi_cache.move_to_end(tanggal)
+                while len(_prediksi_cache) > PREDIKSI_CACHE_MAX:
+                    _prediksi_cache.popitem(last=False)
+        finally:
+            with _prediksi_lock:
+                _prediksi_inflight.pop(tanggal, None)
+    return prediksi
+
 @app.get("/snapshots")
 def list_snapshots():
     """List semua snapshot yang tersimpan di Redis (forecast_snapshot:*)."""
@@ -59,7 +140,7 @@ def get_forecasts(nama_faskes: str, days: int = 14):
     """Ambil barisan forecast dari DB untuk `nama_faskes` untuk `days` ke depan.
     Jika tidak ada data ditemukan, kembalikan 404.
     """
-    session = SessionLocal()
+    session = ReadSessionLocal()
     try:
         today = date.today()
         end = today + timedelta(days=days)
@@ -75,12 +156,26 @@ def get_forecasts(nama_faskes: str, days: int = 14):
                 'yhat': rrow.yhat,
                 'yhat_lower': rrow.yhat_lower,
                 'yhat_upper': rrow.yhat_upper,
+                'interval_method': rrow.interval_method,
                 'generated_at': rrow.generated_at.isoformat() if rrow.generated_at else None
             })
         return JSONResponse(content=out)
     finally:
         session.close()
 
+@app.get("/recommend")
+def recommend(lat: float, lon: float, tanggal: date = None, radius_km: float = 10.0, k: int = 5):
+    """Rekomendasi top-k faskes dalam `radius_km` dari lokasi user (lat, lon) untuk `tanggal`
+    (default: besok), diurutkan menurut skor_akhir (jarak + kepadatan prediksi).
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=422, detail="Invalid coordinates")
+    if not math.isfinite(radius_km) or radius_km <= 0 or k <= 0:
+        raise HTTPException(status_code=422, detail="radius_km must be a positive finite number and k positive")
+    tanggal = tanggal or date.today() + timedelta(days=1)
+    out = faskes_index.recommend(lat, lon, load_prediksi(tanggal), radius_km=radius_km, k=k)
+    return JSONResponse(content={'tanggal': tanggal.isoformat(), 'results': out})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=9000)
@@ -14,10 +14,9 @@ import redis
 import json
 import time
 from datetime import datetime, timedelta
-import pandas as pd
-from prophet import Prophet
+from forecast_intervals import make_prophet, predict_with_intervals, DEFAULT_INTERVAL_MODE
 from sqlalchemy.orm import Session
-from db_models import Visit, Forecast, SessionLocal, init_db
+from db_models import Visit, SessionLocal, init_db, bulk_insert_forecasts, load_daily_history
 
 # Konfigurasi
 REDIS_HOST = '127.0.0.1'
@@ -28,6 +27,7 @@ CONSUMER_NAME = 'worker_1'
 BATCH_SIZE = 20  # jalankan forecast setelah batch size event per faskes
 FORECAST_DAYS = 14
 SNAPSHOT_KEY_PREFIX = 'forecast_snapshot:'
+INTERVAL_MODE = DEFAULT_INTERVAL_MODE  # full / reduced / residual, lihat forecast_intervals.py
 
 r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
 
@@ -72,36 +72,34 @@ def save_visit_to_db(session: Session, rec: dict):
 
 def run_forecast_for_faskes(session: Session, nama_faskes: str):
     print('Running forecast for', nama_faskes)
-    q = session.query(Visit).filter(Visit.nama_faskes == nama_faskes).order_by(Visit.ds)
-    rows = q.all()
-    if not rows:
+    df = load_daily_history(session, nama_faskes)[['ds', 'y']]
+    if df.empty:
         print('No history for', nama_faskes)
         return
-    df = pd.DataFrame([{'ds': r.ds, 'y': r.y} for r in rows])
-    df['ds'] = pd.to_datetime(df['ds'])
 
     # training
     try:
-        model = Prophet(daily_seasonality=True, yearly_seasonality=False)
+        model = make_prophet(INTERVAL_MODE)
         model.fit(df)
     except Exception as e:
         print('Error training model:', e)
         return
 
     future = model.make_future_dataframe(periods=FORECAST_DAYS)
-    forecast = model.predict(future)
+    forecast = predict_with_intervals(model, future, INTERVAL_MODE)
     now = datetime.utcnow()
 
     # Simpan forecast ke DB (hapus forecast lama untuk faskes dan rentang ds?)
-    # Simpel: insert forecast rows
-    for _, row in forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].iterrows():
-        rec = Forecast(nama_faskes=nama_faskes,
-                       ds=row['ds'].date(),
-                       yhat=float(row['yhat']),
-                       yhat_lower=float(row['yhat_lower']),
-                       yhat_upper=float(row['yhat_upper']),
-                       generated_at=now)
-        session.add(rec)
+    # Simpel: insert forecast rows (satu bulk insert / COPY)
+    rows = [{'nama_faskes': nama_faskes,
+             'ds': ds.date(),
+             'yhat': float(yhat),
+             'yhat_lower': float(lower),
+             'yhat_upper': float(upper),
+             'interval_method': INTERVAL_MODE,
+             'generated_at': now}
+            for ds, yhat, lower, upper in forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].itertuples(index=False)]
+    bulk_insert_forecasts(session, rows)
     session.commit()
 
     # Simpan snapshot ke Redis (mis: next 7-day summary)